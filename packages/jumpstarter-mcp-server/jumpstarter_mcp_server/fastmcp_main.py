@@ -4,24 +4,187 @@ Jumpstarter MCP Server using FastMCP
 """
 
 import asyncio
+import functools
+import inspect
+import io
+import itertools
 import json
 import logging
 import os
+import shlex
+import shutil
+import subprocess
 import sys
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
 
+from anyio.from_thread import BlockingPortal
 from fastmcp import FastMCP
 
 from jumpstarter.config.client import ClientConfigV1Alpha1
+from jumpstarter.config.env import JUMPSTARTER_HOST
 from jumpstarter.config.exporter import ExporterConfigV1Alpha1
 from jumpstarter.config.user import UserConfigV1Alpha1
+from jumpstarter.utils.env import env_async
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 logger = logging.getLogger(__name__)
 
+_POWER_ACTIONS = frozenset({"on", "off", "cycle"})
+_SERIAL_ACTIONS = frozenset({"start", "send_command", "info"})
+_SSH_ACTIONS = frozenset({"start", "stop", "status"})
+
+_STREAM_YIELD_EVERY = 256
+
+# Candidate attribute names, in order of preference, for the objects returned by the client API
+_EXP_NAME_ATTRS = ('name', 'Name', 'id', 'identifier')
+_EXP_LABELS_ATTRS = ('labels', 'Labels', 'metadata', 'tags')
+_EXP_STATUS_ATTRS = ('status', 'Status', 'state', 'State')
+_EXP_ONLINE_ATTRS = ('online', 'Online', 'available', 'is_online')
+_LEASE_ID_ATTRS = ('id', 'Id', 'ID', 'lease_id', 'identifier')
+_LEASE_NAME_ATTRS = ('name', 'Name', 'lease_name', 'title')
+_LEASE_STATUS_ATTRS = ('status', 'Status', 'state', 'State')
+_LEASE_EXPIRES_ATTRS = ('expires_at', 'expiry', 'expiration', 'expires', 'end_time')
+_LEASE_EXTRA_ATTRS = ('lease_id', 'state', 'exporter_name')
+_CONFIG_ENDPOINT_ATTRS = ('client', 'Client', 'endpoint', 'server')
+_CONFIG_DRIVERS_ATTRS = ('drivers', 'Drivers', 'driver_config')
+
+# Response fields for list items: (key, candidate attributes, default, coercion)
+_EXP_FIELDS = (
+    ('name', _EXP_NAME_ATTRS, 'unknown', None),
+    ('labels', _EXP_LABELS_ATTRS, None, 'dict'),
+    ('status', _EXP_STATUS_ATTRS, 'unknown', None),
+    ('online', _EXP_ONLINE_ATTRS, False, None),
+)
+_LEASE_FIELDS = (
+    ('id', _LEASE_ID_ATTRS, 'unknown', None),
+    ('name', _LEASE_NAME_ATTRS, 'unknown', None),
+    ('status', _LEASE_STATUS_ATTRS, 'unknown', None),
+    ('expires_at', _LEASE_EXPIRES_ATTRS, None, 'str'),
+)
+
+# Generated dict builders, keyed by the class of the listed objects
+_EXPORTER_BUILDERS: Dict[type, Callable[[Any], Dict[str, Any]]] = {}
+_LEASE_BUILDERS: Dict[type, Callable[[Any], Dict[str, Any]]] = {}
+
+
+def _json_default(obj: Any) -> Any:
+    """Match orjson's OPT_NAIVE_UTC datetime output when falling back to the json module"""
+    if isinstance(obj, datetime):
+        return (obj if obj.tzinfo else obj.replace(tzinfo=timezone.utc)).isoformat()
+    return str(obj)
+
+
+def _dumps_bytes(obj: Any) -> bytes:
+    """Serialize a tool response payload as indented JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NAIVE_UTC)
+    return json.dumps(obj, default=_json_default, indent=2).encode()
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool response payload as indented JSON"""
+    return _dumps_bytes(obj).decode()
+
+
+async def _dumps_stream(items: AsyncIterator[Any]) -> str:
+    """Serialize items into an indented JSON list one item at a time.
+
+    Produces the same output as _dumps(list(items)) without holding every item in memory,
+    and yields to the event loop every _STREAM_YIELD_EVERY items.
+    """
+    buf = io.BytesIO()
+    count = 0
+    async for item in items:
+        buf.write(b",\n  " if count else b"[\n  ")
+        # Strings are escaped in JSON, so every raw newline is structural and can be re-indented
+        buf.write(_dumps_bytes(item).replace(b"\n", b"\n  "))
+        count += 1
+        if count % _STREAM_YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+    buf.write(b"\n]" if count else b"[]")
+    return buf.getvalue().decode()
+
+
+def _resolve(sample: Any, candidates: Tuple[str, ...]) -> Optional[str]:
+    """Return the first candidate attribute present on sample, or None if none exist"""
+    for candidate in candidates:
+        if hasattr(sample, candidate):
+            return candidate
+    return None
+
+
+def _compile_builder(sample: Any, fields: Tuple[Tuple[str, Tuple[str, ...], Any, Optional[str]], ...]):
+    """Generate a function that converts objects shaped like sample into a response dict.
+
+    Each field is (key, candidate attribute names, default, coercion). The attribute names are
+    resolved against sample and baked into a single dict expression, so converting an item is
+    one call with no per-field candidate probing. Each resolved attribute is still read with a
+    getattr default, so an instance lacking an attribute its class-mate had gets the default
+    rather than failing. Only names from the module-level candidate tuples are ever
+    interpolated into the generated code.
+    """
+    parts = []
+    for key, candidates, default, coerce in fields:
+        attr = _resolve(sample, candidates)
+        value = f"getattr(e, {attr!r}, {default!r})" if attr is not None else repr(default)
+        if coerce == "dict":
+            value = f"(_v if isinstance(_v := {value}, dict) else {{}})"
+        elif coerce == "str":
+            value = f"(str(_v) if (_v := {value}) else 'unknown')"
+        parts.append(f"{key!r}: {value}")
+    code = f"lambda e: {{{', '.join(parts)}}}"
+    return eval(code, {"__builtins__": {}, "getattr": getattr, "isinstance": isinstance, "dict": dict, "str": str})
+
+
+_MISSING = object()
+
+
+def _lookup(obj: Any, attrs: Dict[str, Any], name: str, default: Any) -> Any:
+    """Read name from a pre-fetched attribute dict, falling back to getattr on obj"""
+    if name in attrs:
+        return attrs[name]
+    return getattr(obj, name, default)
+
+
+# Client configuration does not change between tool calls, so it is loaded once and
+# reused until the TTL expires. Set JMP_CONFIG_CACHE_DISABLE=1 to reload on every call.
+_CONFIG_CACHE_TTL = 3600.0
+_config_cache: Optional[Tuple[float, ClientConfigV1Alpha1]] = None
+# Whether the last loaded config is a ClientConfigV1Alpha1, checked once when it is loaded
+_is_client_config = False
+
+
+async def _load_client_config() -> ClientConfigV1Alpha1:
+    """Load client configuration, reusing the cached copy while it is fresh.
+
+    Cache hits return without leaving the event loop; misses read the config files in a worker thread.
+    """
+    global _config_cache, _is_client_config
+
+    cache_enabled = os.environ.get("JMP_CONFIG_CACHE_DISABLE") != "1"
+    now = time.monotonic()
+    if cache_enabled and _config_cache is not None and now - _config_cache[0] < _CONFIG_CACHE_TTL:
+        return _config_cache[1]
+
+    config = await asyncio.to_thread(_read_client_config)
+    _is_client_config = isinstance(config, ClientConfigV1Alpha1)
+    if cache_enabled:
+        _config_cache = (now, config)
+    return config
+
 
-def _load_client_config() -> ClientConfigV1Alpha1:
-    """Load client configuration following the same logic as CLI tools"""
+def _read_client_config() -> ClientConfigV1Alpha1:
+    """Read client configuration following the same logic as CLI tools"""
     try:
         # Try to create a config directly (will succeed if env vars are set)
         return ClientConfigV1Alpha1()
@@ -33,410 +196,426 @@ def _load_client_config() -> ClientConfigV1Alpha1:
         return user_config.config.current_client
 
 
+@functools.lru_cache(maxsize=32)
+def _env_for_lease(lease_id: Optional[str]) -> Mapping[str, str]:
+    """Environment for j subprocesses, merged once per lease.
+
+    Call _env_for_lease.cache_clear() after changing os.environ.
+    """
+    return MappingProxyType({**os.environ, **({"JMP_LEASE": lease_id} if lease_id else {})})
+
+
+_j_path: Optional[str] = None
+
+
+def _j_executable() -> str:
+    """Absolute path of the j CLI, or plain "j" if it is not on PATH.
+
+    Only a resolved path is cached, so a j installed after start-up is picked up on the next call.
+    """
+    global _j_path
+
+    if _j_path is None:
+        _j_path = shutil.which("j")
+        if _j_path is None:
+            logger.warning("j not found on PATH, j commands will be started with fork+exec")
+            return "j"
+    return _j_path
+
+
+async def _spawn_j(*args: str, lease_id: Optional[str], stderr: int) -> asyncio.subprocess.Process:
+    """Start a j subprocess with stdout piped.
+
+    CPython only launches children with posix_spawn (instead of forking the whole server)
+    for an absolute executable path, close_fds=False and no new session. Descriptors
+    opened by Python are non-inheritable (PEP 446), so keeping close_fds off is safe.
+    """
+    return await asyncio.create_subprocess_exec(
+        _j_executable(), *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=stderr,
+        env=_env_for_lease(lease_id),
+        close_fds=False,
+        start_new_session=False,
+    )
+
+
+async def _iter_dicts(
+    items: Iterator[Any],
+    builders: Dict[type, Callable[[Any], Dict[str, Any]]],
+    fields: Tuple[Tuple[str, Tuple[str, ...], Any, Optional[str]], ...],
+    id_key: str,
+    kind: str,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Convert API objects to a more readable format, one dict at a time"""
+    first = next(items, _MISSING)
+    if first is _MISSING:
+        logger.debug("Found 0 %ss", kind)
+        return
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("First %s type: %s", kind, type(first))
+        logger.debug("First %s dir: %s", kind, dir(first))
+
+    # Attribute names are resolved once per class against its first listed instance; the
+    # builder falls back to the defaults for instances missing one of those attributes
+    item_type = type(first)
+    build = builders.get(item_type)
+    if build is None:
+        build = builders[item_type] = _compile_builder(first, fields)
+
+    count = 0
+    for item in itertools.chain((first,), items):
+        info = build(item)
+
+        # If we still don't have an identifier, try to extract it from string representation
+        if info[id_key] == 'unknown':
+            item_str = str(item)
+            if item_str and item_str != str(type(item)):
+                info[id_key] = item_str
+
+        count += 1
+        yield info
+
+    logger.debug("Found %d %ss", count, kind)
+
+
+def _iter_exporter_dicts(exporters: Iterator[Any]) -> AsyncIterator[Dict[str, Any]]:
+    return _iter_dicts(exporters, _EXPORTER_BUILDERS, _EXP_FIELDS, 'name', 'exporter')
+
+
+def _iter_lease_dicts(leases: Iterator[Any]) -> AsyncIterator[Dict[str, Any]]:
+    return _iter_dicts(leases, _LEASE_BUILDERS, _LEASE_FIELDS, 'id', 'lease')
+
+
+def _keep_client_logs_off_stdout(client: Any) -> None:
+    """Stop a driver client tree from logging to stdout, which carries the MCP protocol.
+
+    DriverClient attaches a stdout RichHandler to its logger when the logger has no handlers.
+    Replacing it with a NullHandler leaves records to propagate to the root logger, which
+    main() configures on stderr, and keeps later clients from re-adding the RichHandler.
+    """
+    pending = [client]
+    while pending:
+        current = pending.pop()
+        current.logger.handlers = [logging.NullHandler()]
+        pending.extend(getattr(current, "children", {}).values())
+
+
+async def _power_in_process(action: str) -> None:
+    """Run a power action on the exporter behind JUMPSTARTER_HOST without spawning j"""
+    async with BlockingPortal() as portal:
+        with ExitStack() as stack:
+            async with env_async(portal, stack) as client:
+                _keep_client_logs_off_stdout(client)
+                # Driver client methods are synchronous and call back into the portal
+                await asyncio.to_thread(getattr(client.power, action))
+
+
+def _tool_errors(message: str):
+    """Log tool failures and re-raise them as RuntimeError prefixed with message.
+
+    message may reference the tool's arguments by name, e.g. "Failed to execute power {action}".
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                prefix = message.format_map(bound.arguments)
+                logger.exception(prefix)
+                raise RuntimeError(f"{prefix}: {e}") from e
+
+        return wrapper
+
+    return decorator
+
+
 # Initialize FastMCP server
 mcp = FastMCP("jumpstarter-mcp-server")
 
 
 @mcp.tool
-async def jumpstarter_get_config() -> str:
+@_tool_errors("Failed to load configuration")
+async def jumpstarter_get_config(include_attributes: bool = False) -> str:
     """Get current Jumpstarter configuration information"""
-    try:
-        config = _load_client_config()
-        config_type = type(config).__name__
-
-        config_info = {
-            "type": config_type,
-            "is_client_config": isinstance(config, ClientConfigV1Alpha1),
-            "is_exporter_config": isinstance(config, ExporterConfigV1Alpha1),
-        }
-
-        if isinstance(config, ClientConfigV1Alpha1):
-            # Try different possible attribute names for the config structure
-            endpoint = 'unknown'
-            for attr in ['client', 'Client', 'endpoint', 'server']:
-                if hasattr(config, attr):
-                    client_obj = getattr(config, attr)
-                    if hasattr(client_obj, 'endpoint'):
-                        endpoint = client_obj.endpoint
-                        break
-                    elif isinstance(client_obj, str):
-                        endpoint = client_obj
-                        break
-
-            driver_allow = []
-            unsafe_drivers = False
-            for attr in ['drivers', 'Drivers', 'driver_config']:
-                if hasattr(config, attr):
-                    drivers_obj = getattr(config, attr)
-                    if hasattr(drivers_obj, 'allow'):
-                        driver_allow = drivers_obj.allow
-                    if hasattr(drivers_obj, 'unsafe'):
-                        unsafe_drivers = drivers_obj.unsafe
+    config = await _load_client_config()
+    config_type = type(config).__name__
+
+    config_info = {
+        "type": config_type,
+        "is_client_config": _is_client_config,
+        "is_exporter_config": isinstance(config, ExporterConfigV1Alpha1),
+    }
+
+    if _is_client_config:
+        # Try different possible attribute names for the config structure
+        endpoint = 'unknown'
+        for attr in _CONFIG_ENDPOINT_ATTRS:
+            if hasattr(config, attr):
+                client_obj = getattr(config, attr)
+                if hasattr(client_obj, 'endpoint'):
+                    endpoint = client_obj.endpoint
                     break
+                elif isinstance(client_obj, str):
+                    endpoint = client_obj
+                    break
+
+        driver_allow = []
+        unsafe_drivers = False
+        for attr in _CONFIG_DRIVERS_ATTRS:
+            if hasattr(config, attr):
+                drivers_obj = getattr(config, attr)
+                if hasattr(drivers_obj, 'allow'):
+                    driver_allow = drivers_obj.allow
+                if hasattr(drivers_obj, 'unsafe'):
+                    unsafe_drivers = drivers_obj.unsafe
+                break
 
-            config_info.update({
-                "endpoint": endpoint,
-                "driver_allow_list": driver_allow,
-                "unsafe_drivers": unsafe_drivers,
-                "config_attributes": [attr for attr in dir(config) if not attr.startswith('_')]
-            })
+        config_info.update({
+            "endpoint": endpoint,
+            "driver_allow_list": driver_allow,
+            "unsafe_drivers": unsafe_drivers,
+        })
+        if include_attributes:
+            config_info["config_attributes"] = [attr for attr in dir(config) if not attr.startswith('_')]
 
-        return f"Jumpstarter Configuration:\n{json.dumps(config_info, indent=2)}"
-    except Exception as e:
-        raise RuntimeError(f"Failed to load configuration: {str(e)}")
+    return f"Jumpstarter Configuration:\n{_dumps(config_info)}"
 
 
 @mcp.tool
+@_tool_errors("Failed to list exporters")
 async def jumpstarter_list_exporters(
     selector: Optional[str] = None,
     include_leases: bool = False,
     include_online: bool = True
 ) -> str:
     """List available hardware exporters and their status"""
-    try:
-        config = await asyncio.to_thread(_load_client_config)
+    config = await _load_client_config()
 
-        if not isinstance(config, ClientConfigV1Alpha1):
-            raise RuntimeError("Client configuration required for listing exporters")
+    if not _is_client_config:
+        raise RuntimeError("Client configuration required for listing exporters")
 
-        exporters = await asyncio.to_thread(
-            config.list_exporters,
-            filter=selector,
-            include_leases=include_leases,
-            include_online=include_online
-        )
-
-        # Debug: Let's see what we actually get
-        logger.info(f"Exporters type: {type(exporters)}")
-        logger.info(f"Exporters dir: {dir(exporters)}")
-
-        # Handle ExporterList object
-        try:
-            if hasattr(exporters, 'exporters'):
-                exporter_list = list(exporters.exporters)
-            elif hasattr(exporters, 'items'):
-                exporter_list = list(exporters.items)
-            else:
-                # Try to iterate directly
-                exporter_list = list(exporters)
-        except Exception as list_error:
-            logger.error(f"Failed to convert exporters to list: {list_error}")
-            exporter_list = []
-
-        logger.info(f"Found {len(exporter_list)} exporters")
-        if exporter_list:
-            logger.info(f"First exporter type: {type(exporter_list[0])}")
-            logger.info(f"First exporter dir: {dir(exporter_list[0])}")
-
-        # Convert exporters to a more readable format
-        exporter_data = []
-        for exp in exporter_list:
-            # Try different attribute names that might exist
-            exporter_info = {}
-
-            # Try common attribute patterns
-            for name_attr in ['name', 'Name', 'id', 'identifier']:
-                if hasattr(exp, name_attr):
-                    exporter_info['name'] = getattr(exp, name_attr)
-                    break
-            else:
-                exporter_info['name'] = 'unknown'
-
-            for labels_attr in ['labels', 'Labels', 'metadata', 'tags']:
-                if hasattr(exp, labels_attr):
-                    labels = getattr(exp, labels_attr)
-                    if isinstance(labels, dict):
-                        exporter_info['labels'] = labels
-                    else:
-                        exporter_info['labels'] = {}
-                    break
-            else:
-                exporter_info['labels'] = {}
-
-            for status_attr in ['status', 'Status', 'state', 'State']:
-                if hasattr(exp, status_attr):
-                    exporter_info['status'] = getattr(exp, status_attr)
-                    break
-            else:
-                exporter_info['status'] = 'unknown'
-
-            for online_attr in ['online', 'Online', 'available', 'is_online']:
-                if hasattr(exp, online_attr):
-                    exporter_info['online'] = getattr(exp, online_attr)
-                    break
-            else:
-                exporter_info['online'] = False
+    # The client methods return coroutines when called from a running event loop, so the
+    # gRPC call runs on this loop instead of occupying a worker thread
+    exporters = await config.list_exporters(
+        filter=selector,
+        include_leases=include_leases,
+        include_online=include_online
+    )
 
-            # If we still don't have a name, try to extract it from string representation
-            if exporter_info['name'] == 'unknown':
-                exp_str = str(exp)
-                if exp_str and exp_str != str(type(exp)):
-                    exporter_info['name'] = exp_str
+    # Debug: Let's see what we actually get
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Exporters type: %s", type(exporters))
+        logger.debug("Exporters dir: %s", dir(exporters))
 
-            exporter_data.append(exporter_info)
+    # Handle ExporterList object
+    try:
+        if hasattr(exporters, 'exporters'):
+            exporter_iter = iter(exporters.exporters)
+        elif hasattr(exporters, 'items'):
+            exporter_iter = iter(exporters.items)
+        else:
+            # Try to iterate directly
+            exporter_iter = iter(exporters)
+    except Exception as iter_error:
+        logger.error("Failed to iterate exporters: %s", iter_error)
+        exporter_iter = iter(())
 
-        return f"Available Exporters:\n{json.dumps(exporter_data, indent=2)}"
-    except Exception as e:
-        logger.exception("Error listing exporters")
-        raise RuntimeError(f"Failed to list exporters: {str(e)}")
+    return f"Available Exporters:\n{await _dumps_stream(_iter_exporter_dicts(exporter_iter))}"
 
 
 @mcp.tool
+@_tool_errors("Failed to list leases")
 async def jumpstarter_list_leases(selector: Optional[str] = None) -> str:
     """List active hardware leases"""
-    try:
-        config = await asyncio.to_thread(_load_client_config)
-
-        if not isinstance(config, ClientConfigV1Alpha1):
-            raise RuntimeError("Client configuration required for listing leases")
-
-        leases = await asyncio.to_thread(config.list_leases, filter=selector)
-
-        # Debug: Let's see what we actually get for leases
-        logger.info(f"Leases type: {type(leases)}")
-        logger.info(f"Leases dir: {dir(leases)}")
-
-        # Handle LeaseList object - similar to ExporterList
-        try:
-            if hasattr(leases, 'leases'):
-                lease_list = list(leases.leases)
-            elif hasattr(leases, 'items'):
-                lease_list = list(leases.items)
-            else:
-                # Try to iterate directly
-                lease_list = list(leases)
-        except Exception as list_error:
-            logger.error(f"Failed to convert leases to list: {list_error}")
-            lease_list = []
-
-        logger.info(f"Found {len(lease_list)} leases")
-        if lease_list:
-            logger.info(f"First lease type: {type(lease_list[0])}")
-            logger.info(f"First lease dir: {dir(lease_list[0])}")
-
-        # Convert leases to a more readable format
-        lease_data = []
-        for lease in lease_list:
-            # Try different attribute names that might exist
-            lease_info = {}
-
-            # Try common attribute patterns for lease ID
-            for id_attr in ['id', 'Id', 'ID', 'lease_id', 'identifier']:
-                if hasattr(lease, id_attr):
-                    lease_info['id'] = getattr(lease, id_attr)
-                    break
-            else:
-                lease_info['id'] = 'unknown'
+    config = await _load_client_config()
 
-            # Try common attribute patterns for lease name
-            for name_attr in ['name', 'Name', 'lease_name', 'title']:
-                if hasattr(lease, name_attr):
-                    lease_info['name'] = getattr(lease, name_attr)
-                    break
-            else:
-                lease_info['name'] = 'unknown'
+    if not _is_client_config:
+        raise RuntimeError("Client configuration required for listing leases")
 
-            # Try common attribute patterns for status
-            for status_attr in ['status', 'Status', 'state', 'State']:
-                if hasattr(lease, status_attr):
-                    lease_info['status'] = getattr(lease, status_attr)
-                    break
-            else:
-                lease_info['status'] = 'unknown'
-
-            # Try common attribute patterns for expiration
-            for expires_attr in ['expires_at', 'expiry', 'expiration', 'expires', 'end_time']:
-                if hasattr(lease, expires_attr):
-                    expires_val = getattr(lease, expires_attr)
-                    lease_info['expires_at'] = str(expires_val) if expires_val else 'unknown'
-                    break
-            else:
-                lease_info['expires_at'] = 'unknown'
+    leases = await config.list_leases(filter=selector)
 
-            # If we still don't have an ID, try to extract it from string representation
-            if lease_info['id'] == 'unknown':
-                lease_str = str(lease)
-                if lease_str and lease_str != str(type(lease)):
-                    lease_info['id'] = lease_str
+    # Debug: Let's see what we actually get for leases
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Leases type: %s", type(leases))
+        logger.debug("Leases dir: %s", dir(leases))
 
-            lease_data.append(lease_info)
+    # Handle LeaseList object - similar to ExporterList
+    try:
+        if hasattr(leases, 'leases'):
+            lease_iter = iter(leases.leases)
+        elif hasattr(leases, 'items'):
+            lease_iter = iter(leases.items)
+        else:
+            # Try to iterate directly
+            lease_iter = iter(leases)
+    except Exception as iter_error:
+        logger.error("Failed to iterate leases: %s", iter_error)
+        lease_iter = iter(())
 
-        return f"Active Leases:\n{json.dumps(lease_data, indent=2)}"
-    except Exception as e:
-        logger.exception("Error listing leases")
-        raise RuntimeError(f"Failed to list leases: {str(e)}")
+    return f"Active Leases:\n{await _dumps_stream(_iter_lease_dicts(lease_iter))}"
 
 
 @mcp.tool
+@_tool_errors("Failed to create lease")
 async def jumpstarter_create_lease(
     selector: str = "",
     lease_name: Optional[str] = None,
     duration_minutes: int = 30
 ) -> str:
     """Create a hardware lease for testing"""
-    try:
-        # Load config synchronously since _load_client_config is not async
-        config = _load_client_config()
-
-        if not isinstance(config, ClientConfigV1Alpha1):
-            raise RuntimeError("Client configuration required for creating leases")
-
-        if not selector:
-            raise ValueError("Selector is required for creating a lease (e.g., 'board-type=j784s4evm,enabled=true')")
-
-        # Use the client to create a real lease
-        from datetime import timedelta
-        duration = timedelta(minutes=duration_minutes)
-
-        logger.info(f"Creating lease with selector: {selector}, duration: {duration_minutes} minutes")
-
-        # Create the lease using the client API
-        try:
-            # Try with selector and duration first
-            lease_request = await config.create_lease(
-                selector=selector,
-                duration=duration
-            )
-        except TypeError as e:
-            if "unexpected keyword argument" in str(e):
-                # If duration or other parameters are not supported, try with just selector
-                logger.warning(f"Parameter not supported, trying with selector only: {e}")
-                try:
-                    lease_request = await config.create_lease(selector=selector)
-                except TypeError as e2:
-                    if "unexpected keyword argument" in str(e2):
-                        # If even selector is not supported as keyword, try positional
-                        logger.warning(f"Selector as keyword not supported, trying positional: {e2}")
-                        lease_request = await config.create_lease(selector)
-                    else:
-                        raise
-            else:
-                raise
-
-        # Extract lease information
-        lease_info = {
-            "lease_id": getattr(lease_request, 'id', 'unknown'),
-            "selector": selector,
-            "lease_name": lease_name or getattr(lease_request, 'name', 'unknown'),
-            "duration_minutes": duration_minutes,
-            "status": getattr(lease_request, 'status', 'unknown'),
-            "created_at": str(getattr(lease_request, 'created_at', 'unknown')),
-            "expires_at": str(getattr(lease_request, 'expires_at', 'unknown'))
-        }
+    config = await _load_client_config()
+
+    if not _is_client_config:
+        raise RuntimeError("Client configuration required for creating leases")
+
+    if not selector:
+        raise ValueError("Selector is required for creating a lease (e.g., 'board-type=j784s4evm,enabled=true')")
 
-        # Try to get more attributes if available
-        if hasattr(lease_request, '__dict__'):
-            for attr_name in ['lease_id', 'state', 'exporter_name']:
-                if hasattr(lease_request, attr_name):
-                    lease_info[attr_name] = getattr(lease_request, attr_name)
+    # Use the client to create a real lease
+    from datetime import timedelta
+    duration = timedelta(minutes=duration_minutes)
 
-        return f"Lease Created Successfully!\n{json.dumps(lease_info, indent=2)}\n\nYou can now use this lease with other Jumpstarter tools by referencing the lease_id."
+    logger.info("Creating lease with selector: %s, duration: %d minutes", selector, duration_minutes)
 
-    except Exception as e:
-        logger.exception("Error creating lease")
-        raise RuntimeError(f"Failed to create lease: {str(e)}")
+    # Create the lease using the client API
+    try:
+        # Try with selector and duration first
+        lease_request = await config.create_lease(
+            selector=selector,
+            duration=duration
+        )
+    except TypeError as e:
+        if "unexpected keyword argument" in str(e):
+            # If duration or other parameters are not supported, try with just selector
+            logger.warning("Parameter not supported, trying with selector only: %s", e)
+            try:
+                lease_request = await config.create_lease(selector=selector)
+            except TypeError as e2:
+                if "unexpected keyword argument" in str(e2):
+                    # If even selector is not supported as keyword, try positional
+                    logger.warning("Selector as keyword not supported, trying positional: %s", e2)
+                    lease_request = await config.create_lease(selector)
+                else:
+                    raise
+        else:
+            raise
+
+    # Extract lease information from a single snapshot of the instance attributes,
+    # falling back to getattr only for attributes not stored there (properties, slots)
+    attrs = getattr(lease_request, '__dict__', None) or {}
+    lease_info = {
+        "lease_id": _lookup(lease_request, attrs, 'id', 'unknown'),
+        "selector": selector,
+        "lease_name": lease_name or _lookup(lease_request, attrs, 'name', 'unknown'),
+        "duration_minutes": duration_minutes,
+        "status": _lookup(lease_request, attrs, 'status', 'unknown'),
+        # Datetimes are kept as-is and serialized to ISO-8601 by _dumps
+        "created_at": _lookup(lease_request, attrs, 'created_at', None) or 'unknown',
+        "expires_at": _lookup(lease_request, attrs, 'expires_at', None) or 'unknown'
+    }
+
+    # Add more attributes if available
+    for attr_name in _LEASE_EXTRA_ATTRS:
+        value = _lookup(lease_request, attrs, attr_name, _MISSING)
+        if value is not _MISSING:
+            lease_info[attr_name] = value
+
+    return f"Lease Created Successfully!\n{_dumps(lease_info)}\n\nYou can now use this lease with other Jumpstarter tools by referencing the lease_id."
 
 
 @mcp.tool
+@_tool_errors("Failed to execute shell command")
 async def jumpstarter_execute_shell(
     command: List[str],
     selector: str = "",
     lease_name: Optional[str] = None
 ) -> str:
     """Execute shell commands on leased hardware"""
-    try:
-        # This is a PoC implementation - would need proper lease management
-        # and shell execution integration
-        command_info = {
-            "command": command,
-            "selector": selector,
-            "lease_name": lease_name,
-            "status": "Would execute command with these parameters"
-        }
+    # This is a PoC implementation - would need proper lease management
+    # and shell execution integration
+    command_info = {
+        "command": command,
+        "selector": selector,
+        "lease_name": lease_name,
+        "status": "Would execute command with these parameters"
+    }
 
-        return f"Shell Execution Request:\n{json.dumps(command_info, indent=2)}\n\nNote: This is a PoC - actual command execution would require lease management and proper shell integration."
-    except Exception as e:
-        raise RuntimeError(f"Failed to execute shell command: {str(e)}")
+    return f"Shell Execution Request:\n{_dumps(command_info)}\n\nNote: This is a PoC - actual command execution would require lease management and proper shell integration."
 
 
 @mcp.tool
+@_tool_errors("Failed to execute power {action}")
 async def jumpstarter_power_control(action: str, lease_id: Optional[str] = None) -> str:
     """Control hardware power (on/off/cycle) using j power commands"""
-    if action not in ["on", "off", "cycle"]:
+    if action not in _POWER_ACTIONS:
         raise ValueError("Action must be one of: on, off, cycle")
 
-    try:
-        env_vars = {"JMP_LEASE": lease_id} if lease_id else {}
-
-        # Execute j power command
-        process = await asyncio.create_subprocess_exec(
-            "j", "power", action,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env={**os.environ, **env_vars}
-        )
+    if os.environ.get(JUMPSTARTER_HOST):
+        # Inside a jumpstarter shell, drive the power client directly instead of spawning j
+        await _power_in_process(action)
+        return f"Power {action} command executed successfully"
 
-        stdout, stderr = await process.communicate()
+    # Execute j power command, with stderr merged into stdout
+    process = await _spawn_j("power", action, lease_id=lease_id, stderr=asyncio.subprocess.STDOUT)
 
-        if process.returncode == 0:
-            result = f"Power {action} command executed successfully"
-            if stdout:
-                result += f"\nOutput: {stdout.decode()}"
-        else:
-            result = f"Power {action} command failed (exit code: {process.returncode})"
-            if stderr:
-                result += f"\nError: {stderr.decode()}"
+    output, _ = await process.communicate()
+
+    if process.returncode == 0:
+        result = f"Power {action} command executed successfully"
+        if output:
+            result += f"\nOutput: {output.decode()}"
+    else:
+        result = f"Power {action} command failed (exit code: {process.returncode})"
+        if output:
+            result += f"\nError: {output.decode()}"
 
-        return result
-    except Exception as e:
-        raise RuntimeError(f"Failed to execute power {action}: {str(e)}")
+    return result
 
 
 @mcp.tool
+@_tool_errors("Failed to execute serial console action")
 async def jumpstarter_serial_console(
     action: str,
     command: Optional[str] = None,
     lease_id: Optional[str] = None
 ) -> str:
     """Start or interact with serial console (like j serial start-console)"""
-    if action not in ["start", "send_command", "info"]:
+    if action not in _SERIAL_ACTIONS:
         raise ValueError("Action must be one of: start, send_command, info")
 
-    try:
-        env_vars = {"JMP_LEASE": lease_id} if lease_id else {}
-
-        if action == "start":
-            result = "To start serial console interactively, use: j serial start-console\n"
-            result += "Note: MCP server cannot provide interactive console access.\n"
-            result += "Use jumpstarter_serial_console with action='send_command' to send specific commands."
+    if action == "start":
+        result = "To start serial console interactively, use: j serial start-console\n"
+        result += "Note: MCP server cannot provide interactive console access.\n"
+        result += "Use jumpstarter_serial_console with action='send_command' to send specific commands."
 
-        elif action == "send_command":
-            if not command:
-                raise ValueError("command parameter required for send_command action")
+    elif action == "send_command":
+        if not command:
+            raise ValueError("command parameter required for send_command action")
 
-            # This is a simplified implementation - real implementation would need
-            # to maintain persistent serial connections
-            result = f"Would send command to serial console: {command}\n"
-            result += "Note: This is a PoC - actual implementation requires persistent connection management."
+        # This is a simplified implementation - real implementation would need
+        # to maintain persistent serial connections
+        result = f"Would send command to serial console: {command}\n"
+        result += "Note: This is a PoC - actual implementation requires persistent connection management."
 
-        elif action == "info":
-            # Get serial port information
-            process = await asyncio.create_subprocess_exec(
-                "j", "serial", "--help",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env={**os.environ, **env_vars}
-            )
+    elif action == "info":
+        # Get serial port information
+        process = await _spawn_j("serial", "--help", lease_id=lease_id, stderr=asyncio.subprocess.STDOUT)
 
-            stdout, stderr = await process.communicate()
-            result = f"Serial console information:\n{stdout.decode() if stdout else 'No output'}"
+        stdout, _ = await process.communicate()
+        result = f"Serial console information:\n{stdout.decode() if stdout else 'No output'}"
 
-        return result
-    except Exception as e:
-        raise RuntimeError(f"Failed to execute serial console action: {str(e)}")
+    return result
 
 
 @mcp.tool
+@_tool_errors("Failed to execute storage flash")
 async def jumpstarter_storage_flash(
     image_url: str,
     target: Optional[str] = None,
@@ -444,102 +623,90 @@ async def jumpstarter_storage_flash(
     lease_id: Optional[str] = None
 ) -> str:
     """Flash an image to target storage (like j storage flash)"""
-    try:
-        env_vars = {"JMP_LEASE": lease_id} if lease_id else {}
+    cmd = ["j", "storage", "flash"]
+    if target:
+        cmd.extend(["--target", target])
+    if console_debug:
+        cmd.append("--console-debug")
+    cmd.append(image_url)
 
-        cmd = ["j", "storage", "flash"]
-        if target:
-            cmd.extend(["--target", target])
-        if console_debug:
-            cmd.append("--console-debug")
-        cmd.append(image_url)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Storage flash command: %s", shlex.join(cmd))
 
-        result_info = {
-            "command": " ".join(cmd),
-            "image_url": image_url,
-            "target": target,
-            "console_debug": console_debug,
-            "status": "Would execute flash command with these parameters"
-        }
+    result_info = {
+        "argv": cmd,
+        "image_url": image_url,
+        "target": target,
+        "console_debug": console_debug,
+        "status": "Would execute flash command with these parameters"
+    }
 
-        return f"Storage Flash Request:\n{json.dumps(result_info, indent=2)}\n\nNote: This is a PoC - actual flashing would execute the j command and stream progress."
-    except Exception as e:
-        raise RuntimeError(f"Failed to execute storage flash: {str(e)}")
+    return f"Storage Flash Request:\n{_dumps(result_info)}\n\nNote: This is a PoC - actual flashing would execute the j command and stream progress."
 
 
 @mcp.tool
+@_tool_errors("Failed to execute SSH forwarding")
 async def jumpstarter_ssh_forward(
     local_port: int = 2222,
     action: str = "start",
     lease_id: Optional[str] = None
 ) -> str:
     """Set up SSH port forwarding to DUT (like j ssh forward-tcp)"""
-    if action not in ["start", "stop", "status"]:
+    if action not in _SSH_ACTIONS:
         raise ValueError("Action must be one of: start, stop, status")
 
-    try:
-        env_vars = {"JMP_LEASE": lease_id} if lease_id else {}
-
-        if action == "start":
-            cmd = ["j", "ssh", "forward-tcp", str(local_port)]
-            result_info = {
-                "action": "start_forwarding",
-                "local_port": local_port,
-                "command": " ".join(cmd),
-                "usage": f"ssh -p {local_port} -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null root@localhost",
-                "status": "Would start port forwarding"
-            }
-
-        elif action == "status":
-            result_info = {
-                "action": "check_status",
-                "local_port": local_port,
-                "status": "Would check forwarding status"
-            }
-
-        elif action == "stop":
-            result_info = {
-                "action": "stop_forwarding",
-                "local_port": local_port,
-                "status": "Would stop port forwarding"
-            }
-
-        return f"SSH Port Forwarding:\n{json.dumps(result_info, indent=2)}\n\nNote: This is a PoC - actual implementation would manage background forwarding processes."
-    except Exception as e:
-        raise RuntimeError(f"Failed to execute SSH forwarding: {str(e)}")
+    if action == "start":
+        cmd = ["j", "ssh", "forward-tcp", str(local_port)]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("SSH forwarding command: %s", shlex.join(cmd))
+
+        result_info = {
+            "action": "start_forwarding",
+            "local_port": local_port,
+            "argv": cmd,
+            "usage": f"ssh -p {local_port} -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null root@localhost",
+            "status": "Would start port forwarding"
+        }
+
+    elif action == "status":
+        result_info = {
+            "action": "check_status",
+            "local_port": local_port,
+            "status": "Would check forwarding status"
+        }
+
+    elif action == "stop":
+        result_info = {
+            "action": "stop_forwarding",
+            "local_port": local_port,
+            "status": "Would stop port forwarding"
+        }
+
+    return f"SSH Port Forwarding:\n{_dumps(result_info)}\n\nNote: This is a PoC - actual implementation would manage background forwarding processes."
 
 
 @mcp.tool
+@_tool_errors("Failed to execute j command")
 async def jumpstarter_run_j_command(command: List[str], lease_id: Optional[str] = None) -> str:
     """Execute arbitrary j commands within a lease context"""
-    try:
-        env_vars = {"JMP_LEASE": lease_id} if lease_id else {}
-
-        # Execute the j command
-        process = await asyncio.create_subprocess_exec(
-            "j", *command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            env={**os.environ, **env_vars}
-        )
+    # Execute the j command
+    process = await _spawn_j(*command, lease_id=lease_id, stderr=asyncio.subprocess.PIPE)
 
-        stdout, stderr = await process.communicate()
+    stdout, stderr = await process.communicate()
 
-        result_info = {
-            "command": ["j"] + command,
-            "exit_code": process.returncode,
-            "stdout": stdout.decode() if stdout else "",
-            "stderr": stderr.decode() if stderr else ""
-        }
+    result_info = {
+        "command": ["j"] + command,
+        "exit_code": process.returncode,
+        "stdout": stdout.decode() if stdout else "",
+        "stderr": stderr.decode() if stderr else ""
+    }
 
-        if process.returncode == 0:
-            status = "Command executed successfully"
-        else:
-            status = f"Command failed with exit code {process.returncode}"
+    if process.returncode == 0:
+        status = "Command executed successfully"
+    else:
+        status = f"Command failed with exit code {process.returncode}"
 
-        return f"J Command Execution:\n{status}\n\nCommand: {' '.join(['j'] + command)}\n\nOutput:\n{result_info['stdout']}\n\nErrors:\n{result_info['stderr']}"
-    except Exception as e:
-        raise RuntimeError(f"Failed to execute j command: {str(e)}")
+    return f"J Command Execution:\n{status}\n\nCommand: {' '.join(['j'] + command)}\n\nOutput:\n{result_info['stdout']}\n\nErrors:\n{result_info['stderr']}"
 
 
 def main():
@@ -549,6 +716,9 @@ def main():
         stream=sys.stderr,  # Redirect logs to stderr to avoid interfering with MCP protocol
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
+    if not getattr(subprocess, "_USE_POSIX_SPAWN", False):
+        logger.warning("posix_spawn is not available, j commands will be started with fork+exec")
+    _j_executable()
     # FastMCP handles its own asyncio event loop
     mcp.run()
 
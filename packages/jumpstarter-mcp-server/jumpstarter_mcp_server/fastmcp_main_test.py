@@ -0,0 +1,230 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from jumpstarter_driver_composite.driver import Composite
+from jumpstarter_driver_power.driver import MockPower
+
+from . import fastmcp_main
+from jumpstarter.common.utils import serve
+
+
+@pytest.fixture(params=["orjson", "json"])
+def serializer(request, monkeypatch):
+    if request.param == "orjson":
+        # orjson is a declared dependency, so this path must be available rather than skipped
+        assert fastmcp_main.orjson is not None
+    else:
+        monkeypatch.setattr(fastmcp_main, "orjson", None)
+    return request.param
+
+
+async def _agen(items):
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "items",
+    [
+        [],
+        [{"name": "single"}],
+        [
+            {"name": "line\nbreak", "labels": {"note": "first\n  second\r\n"}, "online": True},
+            {"name": "ünïcødé ✓", "labels": {}, "status": None},
+            {"nested": {"list": [1, {"deep": {"deeper": "value"}}], "empty": {}}, "when": datetime(2024, 1, 1)},
+        ],
+    ],
+)
+async def test_dumps_stream_matches_dumps(serializer, items):
+    assert await fastmcp_main._dumps_stream(_agen(items)) == fastmcp_main._dumps(items)
+
+
+def test_dumps_datetimes_as_iso_8601(serializer):
+    assert fastmcp_main._dumps(datetime(2024, 1, 1, 12, 30)) == '"2024-01-01T12:30:00+00:00"'
+    assert fastmcp_main._dumps(datetime(2024, 1, 1, tzinfo=timezone(timedelta(hours=2)))) == (
+        '"2024-01-01T00:00:00+02:00"'
+    )
+
+
+def test_power_in_process_keeps_stdout_clean(monkeypatch, capfd):
+    with serve(Composite(children={"power": MockPower()})) as client:
+
+        @asynccontextmanager
+        async def env_async(portal, stack):
+            yield client
+
+        monkeypatch.setattr(fastmcp_main, "env_async", env_async)
+
+        capfd.readouterr()
+        # cycle logs its progress through the driver client logger
+        asyncio.run(fastmcp_main._power_in_process("cycle"))
+
+    assert capfd.readouterr().out == ""
+
+
+async def _collect(agen):
+    return [item async for item in agen]
+
+
+class Exporter:
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+@pytest.mark.asyncio
+async def test_exporter_dicts_missing_attributes_fall_back_to_defaults(monkeypatch):
+    monkeypatch.setattr(fastmcp_main, "_EXPORTER_BUILDERS", {})
+
+    exporters = [
+        Exporter(name="first", labels={"board": "a"}, status="ready", online=True),
+        # same class, but lacking the attributes resolved on the first instance
+        Exporter(name="second"),
+    ]
+
+    assert await _collect(fastmcp_main._iter_exporter_dicts(iter(exporters))) == [
+        {"name": "first", "labels": {"board": "a"}, "status": "ready", "online": True},
+        {"name": "second", "labels": {}, "status": "unknown", "online": False},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_exporter_dicts_non_dict_labels(monkeypatch):
+    monkeypatch.setattr(fastmcp_main, "_EXPORTER_BUILDERS", {})
+
+    exporters = [Exporter(name="exp", metadata=["not", "a", "dict"])]
+
+    [info] = await _collect(fastmcp_main._iter_exporter_dicts(iter(exporters)))
+    assert info["labels"] == {}
+
+
+@pytest.mark.asyncio
+async def test_dicts_fall_back_to_str_for_identifier(monkeypatch):
+    monkeypatch.setattr(fastmcp_main, "_EXPORTER_BUILDERS", {})
+    monkeypatch.setattr(fastmcp_main, "_LEASE_BUILDERS", {})
+
+    class Described:
+        def __init__(self, **attrs):
+            self.__dict__.update(attrs)
+
+        def __str__(self):
+            return "described-object"
+
+    [exporter] = await _collect(fastmcp_main._iter_exporter_dicts(iter([Described(online=True)])))
+    assert exporter["name"] == "described-object"
+
+    [lease] = await _collect(fastmcp_main._iter_lease_dicts(iter([Described(name="lease")])))
+    assert lease == {"id": "described-object", "name": "lease", "status": "unknown", "expires_at": "unknown"}
+
+
+@pytest.mark.asyncio
+async def test_exporter_builder_is_cached_per_class(monkeypatch):
+    builders = {}
+    monkeypatch.setattr(fastmcp_main, "_EXPORTER_BUILDERS", builders)
+
+    await _collect(fastmcp_main._iter_exporter_dicts(iter([Exporter(name="a", online=True)])))
+    assert list(builders) == [Exporter]
+    build = builders[Exporter]
+
+    # a later listing whose first item has fewer attributes reuses the cached builder
+    result = await _collect(fastmcp_main._iter_exporter_dicts(iter([Exporter(name="b")])))
+    assert builders[Exporter] is build
+    assert result == [{"name": "b", "labels": {}, "status": "unknown", "online": False}]
+
+
+def test_j_executable_only_caches_resolved_path(monkeypatch):
+    monkeypatch.setattr(fastmcp_main, "_j_path", None)
+
+    monkeypatch.setattr(fastmcp_main.shutil, "which", lambda name: None)
+    assert fastmcp_main._j_executable() == "j"
+
+    # j showing up on PATH later is picked up and then cached
+    monkeypatch.setattr(fastmcp_main.shutil, "which", lambda name: "/usr/bin/j")
+    assert fastmcp_main._j_executable() == "/usr/bin/j"
+
+    monkeypatch.setattr(fastmcp_main.shutil, "which", lambda name: None)
+    assert fastmcp_main._j_executable() == "/usr/bin/j"
+
+
+class ConfigReads(list):
+    """Configs handed out by a fake _read_client_config, plus the fake monotonic clock"""
+
+    clock = 1000.0
+
+
+@pytest.fixture
+def config_reads(monkeypatch):
+    reads = ConfigReads()
+
+    def read_client_config():
+        reads.append(object())
+        return reads[-1]
+
+    monkeypatch.setattr(fastmcp_main, "_read_client_config", read_client_config)
+    monkeypatch.setattr(fastmcp_main.time, "monotonic", lambda: reads.clock)
+    monkeypatch.setattr(fastmcp_main, "_config_cache", None)
+    monkeypatch.setattr(fastmcp_main, "_is_client_config", False)
+    monkeypatch.delenv("JMP_CONFIG_CACHE_DISABLE", raising=False)
+    return reads
+
+
+@pytest.mark.asyncio
+async def test_load_client_config_cached_until_ttl(config_reads):
+    first = await fastmcp_main._load_client_config()
+    assert await fastmcp_main._load_client_config() is first
+
+    config_reads.clock += fastmcp_main._CONFIG_CACHE_TTL - 1
+    assert await fastmcp_main._load_client_config() is first
+    assert len(config_reads) == 1
+
+    config_reads.clock += 1
+    second = await fastmcp_main._load_client_config()
+    assert second is not first
+    assert len(config_reads) == 2
+    assert await fastmcp_main._load_client_config() is second
+
+
+@pytest.mark.asyncio
+async def test_load_client_config_cache_disabled(config_reads, monkeypatch):
+    monkeypatch.setenv("JMP_CONFIG_CACHE_DISABLE", "1")
+
+    first = await fastmcp_main._load_client_config()
+    second = await fastmcp_main._load_client_config()
+    assert first is not second
+    assert len(config_reads) == 2
+    assert fastmcp_main._config_cache is None
+
+    # re-enabling the cache does not serve anything read while it was disabled
+    monkeypatch.delenv("JMP_CONFIG_CACHE_DISABLE")
+    assert await fastmcp_main._load_client_config() is config_reads[2]
+
+
+@pytest.mark.asyncio
+async def test_power_control_invalid_action_is_wrapped():
+    # fastmcp >= 2.7 wraps tools in a FunctionTool that keeps the coroutine function on .fn
+    power_control = getattr(fastmcp_main.jumpstarter_power_control, "fn", fastmcp_main.jumpstarter_power_control)
+
+    with pytest.raises(RuntimeError) as excinfo:
+        await power_control(action="bad")
+
+    assert str(excinfo.value) == "Failed to execute power bad: Action must be one of: on, off, cycle"
+    assert isinstance(excinfo.value.__cause__, ValueError)
+
+
+@pytest.mark.asyncio
+async def test_tool_errors_formats_message_with_defaults():
+    @fastmcp_main._tool_errors("Failed to {verb} {target}")
+    async def tool(verb, target="board"):
+        raise OSError("boom")
+
+    with pytest.raises(RuntimeError, match=r"^Failed to flash board: boom$") as excinfo:
+        await tool("flash")
+    assert isinstance(excinfo.value.__cause__, OSError)
+
+    @fastmcp_main._tool_errors("Failed to {verb} {target}")
+    async def ok_tool(verb, target="board"):
+        return f"{verb} {target}"
+
+    assert await ok_tool("flash", target="emmc") == "flash emmc"